@@ -8,6 +8,7 @@ A comprehensive stock analysis tool featuring
 -RSI (Relative Strength Index)
 -MACD (Moving Average Convergence Divergence)
 -Multi-stock comparison
+-Portfolio correlation, covariance, beta and volatility
 -Trading signals and analysis
 Layan Alshaghdari
 courses: CSC 1980/2280
@@ -18,8 +19,12 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
+import time
 from datetime import datetime
 
+TRADING_DAYS = 252
+PORTFOLIO_REFRESH_SECONDS = 300
+
 st.set_page_config(
     page_title="Stock Market Analyzer",
     layout="wide",
@@ -111,6 +116,322 @@ def calculate_macd(data, fast=12, slow=26, signal=9):
     histogram = macd - signal_line
     return macd, signal_line, histogram
 
+def fetch_closes(symbols, period=None, start=None):
+    """
+    Download closing prices for many symbols in a single batched request
+    Parameters:
+    symbols : list of str
+        Stock tickers to download
+    period : str
+        yfinance period (e.g. "1y"), used when start is not given
+    start : date-like
+        First date to download, used for incremental updates
+    Returns:
+    -------
+    DataFrame
+        Closing prices, one column per symbol, indexed by trading date
+    """
+    if start is not None:
+        data = yf.download(symbols, start=start, progress=False, threads=True)
+    else:
+        data = yf.download(symbols, period=period, progress=False, threads=True)
+    if data.empty:
+        return pd.DataFrame(columns=symbols, index=pd.DatetimeIndex([]), dtype=float)
+    closes = data['Close']
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(symbols[0])
+    closes.index = pd.DatetimeIndex(closes.index).tz_localize(None)
+    return closes.reindex(columns=symbols).sort_index()
+
+def align_closes(closes, min_coverage=0.5, last_prices=None):
+    """
+    Put closing prices from different exchanges on one shared calendar
+    Symbols such as 2222.SR trade on different days than US stocks, so their
+    indexes never line up exactly. Dates on which fewer than min_coverage of
+    the symbols traded are dropped, and each symbol's last known price is
+    carried forward over its own holidays. A return on the next kept date
+    therefore spans the whole gap instead of being lost.
+    Parameters:
+    closes : DataFrame
+        Closing prices, one column per symbol (may contain gaps)
+    min_coverage : float
+        Fraction of symbols that must trade for a date to be kept (default is 0.5)
+    last_prices : Series
+        Last aligned price per symbol, used to continue an existing series
+    Returns:
+    -------
+    DataFrame
+        Calendar-aligned prices (NaN only before a symbol's first trade)
+    """
+    closes = closes.sort_index()
+    keep = closes.notna().mean(axis=1) >= min_coverage
+    aligned = closes.ffill()
+    if last_prices is not None:
+        aligned = aligned.fillna(last_prices)
+    return aligned[keep]
+
+def calculate_return_stats(returns):
+    """
+    Build the running sums needed for covariance and correlation
+    The sums are kept per pair of symbols over the days both have data, so
+    symbols with shorter histories are handled without dropping rows for
+    everyone else. Every result is a single matrix product, which keeps
+    500+ symbols interactive.
+    Parameters:
+    returns : DataFrame
+        Daily returns, one column per symbol
+    Returns:
+    -------
+    dict
+        Running sums, updated in place by update_return_stats()
+    """
+    n = len(returns.columns)
+    stats = {
+        'symbols': list(returns.columns),
+        'count': np.zeros((n, n)),
+        'sum': np.zeros((n, n)),
+        'sum_sq': np.zeros((n, n)),
+        'sum_prod': np.zeros((n, n)),
+    }
+    return update_return_stats(stats, returns)
+
+def update_return_stats(stats, returns, remove=False):
+    """
+    Add new days of returns to the running sums without recomputing history
+    Parameters:
+    stats : dict
+        Running sums from calculate_return_stats()
+    returns : DataFrame
+        New daily returns, one column per symbol
+    remove : bool
+        Subtract the rows instead, e.g. to replace a day that was still trading (default is False)
+    Returns:
+    -------
+    dict
+        The same stats dictionary, updated
+    """
+    values = returns.reindex(columns=stats['symbols']).to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    mask = valid.astype(float)
+    sign = -1.0 if remove else 1.0
+    stats['count'] += sign * (mask.T @ mask)
+    stats['sum'] += sign * (filled.T @ mask)
+    stats['sum_sq'] += sign * ((filled ** 2).T @ mask)
+    stats['sum_prod'] += sign * (filled.T @ filled)
+    return stats
+
+def calculate_covariance(stats):
+    """
+    Calculate the annualized covariance matrix from running sums
+    Uses the same annualization as the volatility metric (252 trading days).
+    Parameters:
+    stats : dict
+        Running sums from calculate_return_stats()
+    Returns:
+    -------
+    DataFrame
+        Annualized covariance matrix
+    """
+    count = stats['count']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = (stats['sum_prod'] - stats['sum'] * stats['sum'].T / count) / (count - 1)
+    cov[count < 2] = np.nan
+    return pd.DataFrame(cov * TRADING_DAYS, index=stats['symbols'], columns=stats['symbols'])
+
+def calculate_correlation_matrix(stats):
+    """
+    Calculate the correlation matrix from running sums
+    Parameters:
+    stats : dict
+        Running sums from calculate_return_stats()
+    Returns:
+    -------
+    DataFrame
+        Correlation values (-1 to 1)
+    """
+    count = stats['count']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = stats['sum_prod'] - stats['sum'] * stats['sum'].T / count
+        var = stats['sum_sq'] - stats['sum'] ** 2 / count
+        corr = cov / np.sqrt(var * var.T)
+    corr[count < 2] = np.nan
+    np.fill_diagonal(corr, 1.0)
+    return pd.DataFrame(np.clip(corr, -1, 1), index=stats['symbols'], columns=stats['symbols'])
+
+def calculate_rolling_beta(returns, benchmark_returns, window=60):
+    """
+    Calculate the rolling beta of every symbol against a benchmark
+    All symbols are computed together from cumulative sums instead of one
+    rolling regression per column.
+    Parameters:
+    returns : DataFrame
+        Daily returns, one column per symbol
+    benchmark_returns : Series
+        Daily returns of the benchmark
+    window : int
+        Number of days in each rolling window (default is 60)
+    Returns:
+    -------
+    DataFrame
+        Rolling beta values, NaN until a full window is available
+    """
+    values = returns.to_numpy(dtype=float)
+    bench = benchmark_returns.reindex(returns.index).to_numpy(dtype=float)[:, None]
+    valid = ~np.isnan(values) & ~np.isnan(bench)
+    x = np.where(valid, values, 0.0)
+    b = np.where(valid, bench, 0.0)
+
+    def rolling_sum(a):
+        total = np.cumsum(a, axis=0)
+        total[window:] = total[window:] - total[:-window]
+        return total
+
+    count = rolling_sum(valid.astype(float))
+    sum_x = rolling_sum(x)
+    sum_b = rolling_sum(b)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = rolling_sum(x * b) - sum_x * sum_b / count
+        var = rolling_sum(b * b) - sum_b ** 2 / count
+        beta = cov / var
+    beta[count < window] = np.nan
+    return pd.DataFrame(beta, index=returns.index, columns=returns.columns)
+
+def calculate_benchmark_correlation(returns, benchmark_returns):
+    """
+    Calculate the correlation of every symbol with a benchmark
+    Parameters:
+    returns : DataFrame
+        Daily returns, one column per symbol
+    benchmark_returns : Series
+        Daily returns of the benchmark
+    Returns:
+    -------
+    Series
+        Correlation values (-1 to 1), one per symbol
+    """
+    values = returns.to_numpy(dtype=float)
+    bench = benchmark_returns.reindex(returns.index).to_numpy(dtype=float)[:, None]
+    valid = ~np.isnan(values) & ~np.isnan(bench)
+    x = np.where(valid, values, 0.0)
+    b = np.where(valid, bench, 0.0)
+    count = valid.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = (x * b).sum(axis=0) - x.sum(axis=0) * b.sum(axis=0) / count
+        var_x = (x * x).sum(axis=0) - x.sum(axis=0) ** 2 / count
+        var_b = (b * b).sum(axis=0) - b.sum(axis=0) ** 2 / count
+        corr = cov / np.sqrt(var_x * var_b)
+    corr[count < 2] = np.nan
+    return pd.Series(np.clip(corr, -1, 1), index=returns.columns)
+
+def calculate_portfolio_volatility(covariance, weights):
+    """
+    Calculate annualized portfolio volatility
+    Returns NaN instead of a misleading number when a weighted pair of symbols
+    has too little overlapping history, or when the pairwise covariance matrix
+    gives a negative variance for these weights.
+    Parameters:
+    covariance : DataFrame
+        Annualized covariance matrix from calculate_covariance()
+    weights : Series
+        Portfolio weight per symbol (should sum to 1)
+    Returns:
+    -------
+    float
+        Annualized volatility in percent, or NaN if it cannot be estimated
+    """
+    w = weights.reindex(covariance.index).fillna(0).to_numpy()
+    held = w != 0
+    cov = covariance.to_numpy()[np.ix_(held, held)]
+    if np.isnan(cov).any():
+        return np.nan
+    variance = w[held] @ cov @ w[held]
+    if variance < 0:
+        return np.nan
+    return float(np.sqrt(variance)) * 100
+
+def load_portfolio(symbols, period):
+    """
+    Load the aligned return matrix for a portfolio, updating it incrementally
+    The return matrix and running sums are built once per symbol list and
+    period, and only the current one is kept in the session. Symbols without
+    any data are left out, so portfolio['prices'].columns lists the ones used.
+    After PORTFOLIO_REFRESH_SECONDS the last aligned day is downloaded again,
+    since it may have been fetched before the close, and replaced together
+    with any newer days.
+    Parameters:
+    symbols : list of str
+        Stock tickers in the portfolio
+    period : str
+        yfinance period (e.g. "1y")
+    Returns:
+    -------
+    dict
+        Aligned prices, returns and running sums for the portfolio
+    """
+    key = (tuple(symbols), period)
+    portfolio = st.session_state.get('portfolio')
+    if portfolio is None or portfolio['key'] != key:
+        closes = fetch_closes(symbols, period=period)
+        prices = align_closes(closes.loc[:, closes.notna().any()])
+        returns = prices.pct_change(fill_method=None).iloc[1:]
+        portfolio = {
+            'key': key,
+            'prices': prices,
+            'returns': returns,
+            'stats': calculate_return_stats(returns),
+            'benchmark': None,
+            'fetched_at': time.time(),
+        }
+        if len(prices) >= 2:
+            st.session_state['portfolio'] = portfolio
+    elif time.time() - portfolio['fetched_at'] > PORTFOLIO_REFRESH_SECONDS:
+        portfolio['fetched_at'] = time.time()
+        last_date = portfolio['prices'].index[-1]
+        new_closes = fetch_closes(list(portfolio['prices'].columns), start=last_date)
+        new_closes = new_closes[new_closes.index >= last_date]
+        if not new_closes.empty:
+            if last_date not in new_closes.index:
+                new_closes = pd.concat([portfolio['prices'].iloc[[-1]], new_closes])
+            prices = portfolio['prices'].iloc[:-1]
+            last_prices = prices.iloc[-1]
+            new_prices = align_closes(new_closes, last_prices=last_prices)
+            if not new_prices.empty:
+                update_return_stats(portfolio['stats'], portfolio['returns'].iloc[[-1]], remove=True)
+                new_returns = pd.concat([last_prices.to_frame().T, new_prices]).pct_change(fill_method=None).iloc[1:]
+                portfolio['prices'] = pd.concat([prices, new_prices])
+                portfolio['returns'] = pd.concat([portfolio['returns'].iloc[:-1], new_returns])
+                update_return_stats(portfolio['stats'], new_returns)
+                portfolio['benchmark'] = None
+    return portfolio
+
+def load_benchmark(portfolio, symbol):
+    """
+    Load benchmark returns on the portfolio's aligned calendar
+    The benchmark is kept apart from the return matrix so switching the main
+    stock symbol does not download the whole portfolio again.
+    Parameters:
+    portfolio : dict
+        Portfolio from load_portfolio()
+    symbol : str
+        Benchmark ticker
+    Returns:
+    -------
+    Series
+        Benchmark daily returns, indexed like portfolio['returns']
+    """
+    if symbol in portfolio['prices'].columns:
+        return portfolio['returns'][symbol]
+    benchmark = portfolio['benchmark']
+    if benchmark is None or benchmark.name != symbol:
+        prices = portfolio['prices']
+        closes = fetch_closes([symbol], start=prices.index[0])[symbol].dropna()
+        aligned = closes.reindex(closes.index.union(prices.index)).ffill().reindex(prices.index)
+        benchmark = aligned.pct_change(fill_method=None).iloc[1:].rename(symbol)
+        if not closes.empty:
+            portfolio['benchmark'] = benchmark
+    return benchmark
+
 st.markdown('<h1 class="main-header">📈 Stock Market Analyzer Pro</h1>', unsafe_allow_html=True)
 st.markdown('<p class="sub-header">Advanced stock analysis with real-time data and technical indicators</p>', unsafe_allow_html=True)
 
@@ -160,6 +481,37 @@ if compare_mode:
     )
     if compare_input:
         compare_symbols = [s.strip().upper() for s in compare_input.split(",") if s.strip()]
+
+st.sidebar.markdown("---")
+st.sidebar.subheader("💼 Portfolio Analytics")
+portfolio_mode = st.sidebar.checkbox("Enable Portfolio Analytics", value=False)
+portfolio_entries = []
+portfolio_symbols = []
+portfolio_weights = []
+if portfolio_mode:
+    # Seeded once from the comparison symbols, then kept even while the view is switched off
+    if 'portfolio_input' not in st.session_state:
+        st.session_state['portfolio_input'] = st.session_state.get('saved_portfolio_input', ", ".join(compare_symbols))
+    portfolio_input = st.sidebar.text_area(
+        "Portfolio symbols (comma-separated):",
+        key='portfolio_input',
+        placeholder="MSFT, GOOGL, TSLA, 2222.SR",
+        help="Correlation, covariance and beta are measured against the main stock symbol"
+    )
+    st.session_state['saved_portfolio_input'] = portfolio_input
+    portfolio_entries = [s.strip().upper() for s in portfolio_input.split(",") if s.strip()]
+    portfolio_symbols = list(dict.fromkeys(portfolio_entries))
+    weights_input = st.sidebar.text_input(
+        "Weights (comma-separated, optional):",
+        placeholder="Equal weights",
+        help="One weight per portfolio symbol, in the same order"
+    )
+    if weights_input:
+        try:
+            portfolio_weights = [float(w) for w in weights_input.split(",") if w.strip()]
+        except ValueError:
+            st.sidebar.warning("⚠️ Weights must be numbers. Using equal weights.")
+    beta_window = st.sidebar.slider("Beta window (days):", min_value=20, max_value=120, value=60, step=5)
 analyze_button = st.sidebar.button("🔍 Analyze Stock", type="primary", use_container_width=True)
 
 if symbol and (analyze_button or True):
@@ -177,14 +529,14 @@ if symbol and (analyze_button or True):
                 col1, col2, col3, col4, col5 = st.columns(5)
 
                 with col1:
-                    current_price = df['Close'][-1]
+                    current_price = df['Close'].iloc[-1]
                     st.metric(
                         label="💰 Current Price",
                         value=f"${current_price:.2f}"
                     )
                 with col2:
                     if len(df) > 1:
-                        prev_close = df['Close'][-2]
+                        prev_close = df['Close'].iloc[-2]
                         change = current_price - prev_close
                         change_percent = (change / prev_close) * 100
                         st.metric(
@@ -193,7 +545,7 @@ if symbol and (analyze_button or True):
                             delta=f"{change_percent:.2f}%"
                         )
                 with col3:
-                    volume = df['Volume'][-1]
+                    volume = df['Volume'].iloc[-1]
                     st.metric(
                         label="📦 Volume",
                         value=f"{volume:,.0f}"
@@ -327,7 +679,7 @@ if symbol and (analyze_button or True):
                                 comp_stock = yf.Ticker(comp_symbol)
                                 comp_df = comp_stock.history(period=period)
                                 if not comp_df.empty:
-                                    normalized = (comp_df['Close'] / comp_df['Close'][0]) * df['Close'][0]
+                                    normalized = (comp_df['Close'] / comp_df['Close'].iloc[0]) * df['Close'].iloc[0]
                                     fig.add_trace(
                                         go.Scatter(
                                             x=comp_df.index,
@@ -434,12 +786,12 @@ if symbol and (analyze_button or True):
                 with stats_col3:
                     st.metric("📊 Average", f"${df['Close'].mean():.2f}")
                 with stats_col4:
-                    start_price = df['Close'][0]
-                    end_price = df['Close'][-1]
+                    start_price = df['Close'].iloc[0]
+                    end_price = df['Close'].iloc[-1]
                     period_change = ((end_price - start_price) / start_price ) * 100
                     st.metric("📈 Period Change", f"{period_change:.2f}%")
                 with stats_col5:
-                    volatility = df['Close'].pct_change().std() * np.sqrt(252) * 100
+                    volatility = df['Close'].pct_change().std() * np.sqrt(TRADING_DAYS) * 100
                     st.metric("⚡ Volatility (Annualized)", f"{volatility:.2f}%")
                 if show_rsi or show_ma:
                     st.markdown("-------")
@@ -447,7 +799,7 @@ if symbol and (analyze_button or True):
                     signal_col1, signal_col2, signal_col3 = st.columns(3)
                     with signal_col1:
                         if show_rsi and 'RSI' in df.columns:
-                            current_rsi = df['RSI'][-1]
+                            current_rsi = df['RSI'].iloc[-1]
                             if current_rsi > 70:
                                 st.error(f"🚨  **RSI Signal:** Overbought ({current_rsi:.2f})")
                             elif current_rsi < 30:
@@ -456,16 +808,16 @@ if symbol and (analyze_button or True):
                                 st.info(f"ℹ️  **RSI Signal:** Neutral ({current_rsi:.2f}).")
                     with signal_col2:
                         if show_ma and "MA50" in df.columns and "MA200" in df.columns:
-                            ma50_current = df['MA50'][-1]
-                            ma200_current = df['MA200'][-1]
+                            ma50_current = df['MA50'].iloc[-1]
+                            ma200_current = df['MA200'].iloc[-1]
                             if ma50_current > ma200_current:
                                 st.success("✅ **MA Signal:** Bullish (Golden Cross)")
                             else:
                                 st.error("🚨 **MA Signal:** Bearish (Death Cross)")
                     with signal_col3:
-                        current_price = df['Close'][-1]
+                        current_price = df['Close'].iloc[-1]
                         if "MA50" in df.columns:
-                            ma50 = df['MA50'][-1]
+                            ma50 = df['MA50'].iloc[-1]
                             if current_price > ma50:
                                 st.success(f"✅ **Price vs MA50:** Above ({((current_price/ma50-1)*100):.2f}%)")
                             else:
@@ -485,6 +837,116 @@ if symbol and (analyze_button or True):
     except Exception as e:
         st.error(f"❌ An error occurred: {str(e)}")
         st.info("💡 Please check the ticker symbol and try again.")
+
+if symbol and portfolio_mode and portfolio_symbols:
+    st.markdown("-------")
+    st.subheader(f"💼 Portfolio Analytics - {selected_period}")
+    try:
+        with st.spinner(f"📥 Fetching data for {len(portfolio_symbols)} portfolio symbols..."):
+            portfolio = load_portfolio(portfolio_symbols, period)
+            returns = portfolio['returns']
+            benchmark_returns = load_benchmark(portfolio, symbol) if len(returns) >= 2 else None
+        entries = pd.Series(portfolio_entries)
+        duplicates = list(entries[entries.duplicated()].unique())
+        if duplicates:
+            st.warning(f"⚠️ Duplicate symbols are counted once, with their weights added together: {', '.join(duplicates)}")
+        resolved = list(portfolio['prices'].columns)
+        missing = [s for s in portfolio_symbols if s not in resolved]
+        if missing and len(returns) >= 2:
+            st.warning(f"⚠️ No data found for {', '.join(missing)}. They are left out of the portfolio.")
+        if len(returns) < 2 or benchmark_returns.notna().sum() < 2:
+            st.warning(f"⚠️ Not enough overlapping data for the portfolio and '{symbol}'.")
+        else:
+            weights = pd.Series(1.0, index=resolved)
+            if portfolio_weights and len(portfolio_weights) != len(portfolio_entries):
+                st.warning("⚠️ Number of weights does not match number of symbols. Using equal weights.")
+            elif portfolio_weights and sum(portfolio_weights) == 0:
+                st.warning("⚠️ Weights add up to zero. Using equal weights.")
+            elif portfolio_weights:
+                weights = pd.Series(portfolio_weights, index=portfolio_entries).groupby(level=0, sort=False).sum().reindex(resolved)
+                if weights.sum() == 0:
+                    st.warning("⚠️ Weights of the symbols with data add up to zero. Using equal weights.")
+                    weights = pd.Series(1.0, index=resolved)
+            weights = weights / weights.sum()
+
+            covariance = calculate_covariance(portfolio['stats'])
+            correlation = calculate_correlation_matrix(portfolio['stats'])
+            portfolio_corr = correlation.to_numpy()
+            off_diagonal = portfolio_corr[~np.eye(len(resolved), dtype=bool)]
+            portfolio_returns = returns.fillna(0) @ weights
+            betas = calculate_rolling_beta(returns, benchmark_returns, window=beta_window)
+            portfolio_beta = calculate_rolling_beta(portfolio_returns.to_frame('Portfolio'), benchmark_returns, window=beta_window)['Portfolio']
+
+            port_col1, port_col2, port_col3, port_col4 = st.columns(4)
+            with port_col1:
+                portfolio_volatility = calculate_portfolio_volatility(covariance, weights)
+                st.metric("⚡ Portfolio Volatility (Annualized)", f"{portfolio_volatility:.2f}%" if not np.isnan(portfolio_volatility) else "N/A")
+                if np.isnan(portfolio_volatility):
+                    st.caption("Some held symbols have too little overlapping history to estimate portfolio volatility.")
+            with port_col2:
+                avg_corr = np.nanmean(off_diagonal) if off_diagonal.size else np.nan
+                st.metric("🔗 Average Correlation", f"{avg_corr:.2f}" if not np.isnan(avg_corr) else "N/A")
+            with port_col3:
+                current_beta = portfolio_beta.iloc[-1]
+                st.metric(f"📐 Beta vs {symbol}", f"{current_beta:.2f}" if not np.isnan(current_beta) else "N/A")
+            with port_col4:
+                st.metric("📅 Aligned Trading Days", f"{len(returns)}")
+
+            corr_fig = go.Figure(
+                go.Heatmap(
+                    z=portfolio_corr,
+                    x=resolved,
+                    y=resolved,
+                    zmin=-1,
+                    zmax=1,
+                    colorscale='RdBu',
+                    reversescale=True,
+                    hovertemplate='<b>%{x}</b> / <b>%{y}</b>: %{z:.2f}<extra></extra>'
+                )
+            )
+            corr_fig.update_layout(
+                title='Correlation Matrix (Daily Returns)',
+                template='plotly_white',
+                height=max(500, min(1200, 20 * len(resolved)))
+            )
+            st.plotly_chart(corr_fig, use_container_width=True)
+
+            beta_fig = go.Figure(
+                go.Scatter(
+                    x=portfolio_beta.index,
+                    y=portfolio_beta,
+                    mode='lines',
+                    name='Portfolio Beta',
+                    line=dict(color='#2E86DE', width=2),
+                    hovertemplate='<b>Date</b>: %{x}<br><b>Beta</b>: %{y:.2f}<extra></extra>'
+                )
+            )
+            beta_fig.add_hline(y=1, line_dash="dash", line_color="gray", opacity=0.5)
+            beta_fig.update_layout(
+                title=f'Rolling {beta_window}-Day Beta vs {symbol}',
+                template='plotly_white',
+                height=400
+            )
+            st.plotly_chart(beta_fig, use_container_width=True)
+
+            with st.expander("📋 View Symbol Risk Table"):
+                risk_df = pd.DataFrame({
+                    'Weight (%)': weights * 100,
+                    'Volatility (Annualized %)': np.sqrt(np.diag(covariance)) * 100,
+                    f'Correlation vs {symbol}': calculate_benchmark_correlation(returns, benchmark_returns),
+                    f'Beta vs {symbol} ({beta_window}D)': betas.iloc[-1],
+                })
+                st.dataframe(risk_df.round(2), use_container_width=True)
+                st.download_button(
+                    label="📥 Download Covariance Matrix as CSV",
+                    data=covariance.to_csv().encode('utf-8'),
+                    file_name=f"covariance_{datetime.now().strftime('%Y%m%d')}.csv",
+                    mime='text/csv',
+                    use_container_width=True
+                )
+    except Exception as e:
+        st.error(f"❌ Could not build portfolio analytics: {str(e)}")
+        st.info("💡 Please check the portfolio symbols and try again.")
 st.markdown("---")
 st.markdown(
     """
@@ -0,0 +1,542 @@
+"""
+Stock Market Analyzer - Load Test Harness
+=========================================
+Simulates many concurrent Streamlit sessions running app.py in one process,
+the same way a single Streamlit node serves its users.
+-Each session replays a realistic interaction script (switch symbol and
+ period, toggle indicators, enable comparison, open portfolio analytics)
+-Yahoo Finance is replaced by a local stand-in data source with
+ deterministic synthetic prices and configurable network latency
+-Reports latency percentiles, throughput, CPU use and memory per session
+-Exits with status 1 if any run failed or did not render the price chart,
+ so numbers from a broken app are never mistaken for capacity
+
+The harness shares one Streamlit runtime between sessions by patching
+AppTest internals. It is tested with Streamlit 1.66 and stops with an error
+if those internals are missing in the installed version.
+
+Usage:
+    python load_test.py --sessions 1,5,10,25 --iterations 3
+    python load_test.py --sessions 10 --output after.json --compare before.json
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+from functools import lru_cache
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import streamlit
+import yfinance as yf
+
+TESTED_STREAMLIT = "1.66"
+
+try:
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import AppTest, app_test, local_script_runner
+except ImportError as e:
+    sys.exit(f"Streamlit {streamlit.__version__} is not supported by this harness (tested with {TESTED_STREAMLIT}): {e}")
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+MAX_HISTORY_DAYS = 2520
+
+PERIOD_DAYS = {
+    "5d": 5,
+    "1mo": 21,
+    "3mo": 63,
+    "6mo": 126,
+    "1y": 252,
+    "2y": 504,
+    "5y": 1260,
+    "max": MAX_HISTORY_DAYS
+}
+
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "TSLA", "AMZN", "NVDA", "META", "2222.SR", "BTC-USD"]
+PERIODS = ["1 Month", "3 Months", "6 Months", "1 Year", "2 Years"]
+INDICATORS = ["Show Moving Average", "Show RSI", "Show MACD", "Show Volume"]
+
+# Simulated network delay for every stand-in request, in seconds
+data_latency = 0.0
+
+@lru_cache(maxsize=None)
+def make_history(symbol):
+    """
+    Generate deterministic synthetic OHLCV history for a symbol
+    Saudi (.SR) symbols trade Sunday to Thursday so the comparison and
+    portfolio views see the same calendar mismatch as with real data.
+    Parameters:
+    symbol : str
+        Stock ticker
+    Returns:
+    -------
+    DataFrame
+        Open, High, Low, Close and Volume for MAX_HISTORY_DAYS trading days
+    """
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+    end = pd.Timestamp.today().normalize()
+    if symbol.endswith(".SR"):
+        index = pd.bdate_range(end=end, periods=MAX_HISTORY_DAYS, freq="C", weekmask="Sun Mon Tue Wed Thu")
+    else:
+        index = pd.bdate_range(end=end, periods=MAX_HISTORY_DAYS)
+    close = rng.uniform(20, 500) * np.exp(np.cumsum(rng.normal(0.0003, 0.02, MAX_HISTORY_DAYS)))
+    open_ = close * (1 + rng.normal(0, 0.005, MAX_HISTORY_DAYS))
+    spread = np.abs(rng.normal(0, 0.01, MAX_HISTORY_DAYS)) * close
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) + spread,
+        "Low": np.minimum(open_, close) - spread,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, MAX_HISTORY_DAYS).astype(float)
+    }, index=index)
+
+def slice_history(symbol, period=None, start=None):
+    """
+    Return the part of a symbol's synthetic history matching a request
+    Parameters:
+    symbol : str
+        Stock ticker
+    period : str
+        yfinance period (e.g. "1y")
+    start : date-like
+        First date to return, takes precedence over period
+    Returns:
+    -------
+    DataFrame
+        Synthetic OHLCV rows
+    """
+    history = make_history(symbol)
+    if start is not None:
+        return history[history.index >= pd.Timestamp(start)]
+    return history.tail(PERIOD_DAYS.get(period, 21))
+
+class StandInTicker:
+    """
+    Local replacement for yfinance.Ticker
+    """
+    def __init__(self, symbol):
+        self.ticker = symbol.upper()
+
+    def history(self, period="1mo", **kwargs):
+        time.sleep(data_latency)
+        df = slice_history(self.ticker, period=period).copy()
+        df.index = df.index.tz_localize("America/New_York")
+        return df
+
+    @property
+    def info(self):
+        time.sleep(data_latency)
+        rng = np.random.default_rng(zlib.crc32(self.ticker.encode()))
+        close = make_history(self.ticker)["Close"]
+        return {
+            "longName": f"{self.ticker} Synthetic Inc.",
+            "sector": "Technology",
+            "industry": "Software",
+            "country": "United States",
+            "fullTimeEmployees": int(rng.integers(1_000, 200_000)),
+            "marketCap": float(rng.uniform(1e9, 3e12)),
+            "trailingPE": float(rng.uniform(5, 60)),
+            "fiftyTwoWeekHigh": round(float(close.tail(252).max()), 2),
+            "fiftyTwoWeekLow": round(float(close.tail(252).min()), 2),
+            "dividendYield": float(rng.uniform(0, 0.04)),
+            "beta": round(float(rng.uniform(0.5, 2.0)), 2)
+        }
+
+def stand_in_download(tickers, period=None, start=None, **kwargs):
+    """
+    Local replacement for yfinance.download
+    Parameters:
+    tickers : str or list of str
+        Stock tickers to download
+    period : str
+        yfinance period (e.g. "1y")
+    start : date-like
+        First date to download
+    Returns:
+    -------
+    DataFrame
+        Prices with (Price, Ticker) columns, like yfinance
+    """
+    time.sleep(data_latency)
+    if isinstance(tickers, str):
+        tickers = tickers.replace(",", " ").split()
+    frames = {symbol: slice_history(symbol.upper(), period=period, start=start) for symbol in tickers}
+    data = pd.concat(frames, axis=1)
+    return data.swaplevel(axis=1).sort_index(axis=1)
+
+class SharedRuntimeMeta(type(Runtime)):
+    """
+    Keeps the first runtime AppTest installs and ignores later swaps
+    """
+    def __setattr__(cls, name, value):
+        if name == "_instance":
+            if value is not None and Runtime._instance is None:
+                Runtime._instance = value
+            return
+        super().__setattr__(name, value)
+
+class SharedRuntime(Runtime, metaclass=SharedRuntimeMeta):
+    """
+    Stands in for Runtime inside AppTest so sessions don't reset each other
+    """
+
+def shared_runtime(stack):
+    """
+    Make every AppTest session share one runtime, as on a real Streamlit node
+    A Streamlit server compiles app.py once and keeps a single runtime and
+    cache storage for all of its sessions. AppTest instead creates fresh ones
+    for each run and clears the global runtime when a run ends, which breaks
+    sessions running at the same time and hides any st.cache_* benefit.
+    Compiling the script in many threads at once also trips a thread-safety
+    bug in some Python 3.11 releases.
+    Parameters:
+    stack : ExitStack
+        Keeps the patches active until the stack is closed
+    """
+    script_cache = ScriptCache()
+    cache_storage = MemoryCacheStorageManager()
+    targets = [
+        (app_test, "ScriptCache", lambda: script_cache),
+        (local_script_runner, "ScriptCache", lambda: script_cache),
+        (app_test, "MemoryCacheStorageManager", lambda: cache_storage),
+        (app_test, "Runtime", SharedRuntime)
+    ]
+    missing = [f"{module.__name__}.{name}" for module, name, _ in targets if not hasattr(module, name)]
+    if missing:
+        raise RuntimeError(
+            f"Streamlit {streamlit.__version__} is not supported by this harness (tested with {TESTED_STREAMLIT}): "
+            f"missing {', '.join(missing)}"
+        )
+    for module, name, replacement in targets:
+        stack.enter_context(mock.patch.object(module, name, replacement))
+    stack.callback(setattr, Runtime, "_instance", None)
+
+def find_widget(widgets, label):
+    """
+    Find a widget whose label contains the given text
+    """
+    for widget in widgets:
+        if label in widget.label:
+            return widget
+    raise LookupError(f"No widget labelled '{label}'")
+
+def toggle(checkbox):
+    """
+    Flip a checkbox and return it so .run() can be chained
+    """
+    return checkbox.set_value(not checkbox.value)
+
+def find_errors(at):
+    """
+    List what went wrong in the last run: uncaught exceptions, the app's own
+    error messages (shown with a ❌ icon) and runs that rendered no price chart
+    """
+    errors = [f"exception: {e.message}" for e in at.exception]
+    errors += [f"app error: {e.value}" for e in at.error if e.icon == "❌" or str(e.value).startswith("❌")]
+    if not at.get("plotly_chart"):
+        errors.append("no chart rendered")
+    return errors
+
+def run_session(session_id, iterations, seed, timeout, start_barrier):
+    """
+    Run one simulated user session against app.py
+    Parameters:
+    session_id : int
+        Index of the session, used to vary its random choices
+    iterations : int
+        Number of times the interaction script is repeated
+    seed : int
+        Base random seed
+    timeout : float
+        Seconds before a single script run is considered failed
+    start_barrier : threading.Barrier
+        Makes every session start at the same moment (None to start at once)
+    Returns:
+    -------
+    Tuple
+        List of (action, seconds) timings, list of error messages and the live AppTest
+    """
+    rng = random.Random(seed + session_id)
+    timings = []
+    errors = []
+    try:
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    except Exception as e:
+        if start_barrier is not None:
+            start_barrier.abort()
+        return timings, [f"setup: harness: {e!r}"], None
+    if start_barrier is not None:
+        try:
+            start_barrier.wait()
+        except threading.BrokenBarrierError:
+            return timings, ["setup: harness: another session failed to start"], at
+
+    def step(action, interaction):
+        started = time.perf_counter()
+        try:
+            interaction()
+        except Exception as e:
+            errors.append(f"{action}: harness: {e!r}")
+        else:
+            errors.extend(f"{action}: {error}" for error in find_errors(at))
+        timings.append((action, time.perf_counter() - started))
+
+    step("load", lambda: at.run())
+    for _ in range(iterations):
+        step("symbol", lambda: find_widget(at.sidebar.text_input, "Stock Symbol").set_value(rng.choice(SYMBOLS)).run())
+        step("period", lambda: find_widget(at.sidebar.selectbox, "Time Period").select(rng.choice(PERIODS)).run())
+        indicator = rng.choice(INDICATORS)
+        step("indicator", lambda: toggle(find_widget(at.sidebar.checkbox, indicator)).run())
+        step("compare_on", lambda: find_widget(at.sidebar.checkbox, "Enable Comparison Mode").check().run())
+        compare_with = ", ".join(rng.sample(SYMBOLS, 2))
+        step("compare_symbols", lambda: find_widget(at.sidebar.text_input, "Compare with").set_value(compare_with).run())
+        step("compare_off", lambda: find_widget(at.sidebar.checkbox, "Enable Comparison Mode").uncheck().run())
+        step("portfolio_on", lambda: find_widget(at.sidebar.checkbox, "Enable Portfolio Analytics").check().run())
+        holdings = ", ".join(rng.sample([s for s in SYMBOLS if not s.endswith(".SR")], 4) + ["2222.SR"])
+        step("portfolio_symbols", lambda: find_widget(at.sidebar.text_area, "Portfolio symbols").set_value(holdings).run())
+        step("portfolio_off", lambda: find_widget(at.sidebar.checkbox, "Enable Portfolio Analytics").uncheck().run())
+    return timings, errors, at
+
+def measure_session_memory(samples, iterations, seed, timeout):
+    """
+    Measure the Python memory each session keeps after its interactions
+    Sessions run one after another with tracemalloc on and are kept alive, so
+    the result is what every extra user adds. Caches shared between sessions
+    are already warm from the timed runs and are not counted. Runs separately
+    because tracemalloc would slow down the timed runs.
+    Parameters:
+    samples : int
+        Number of sessions to run and keep alive
+    iterations : int
+        Times each session repeats its interaction script
+    seed : int
+        Base random seed
+    timeout : float
+        Seconds before a single script run is considered failed
+    Returns:
+    -------
+    Tuple
+        Retained KB per session, peak KB per session and list of error messages
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        results = [run_session(i, iterations, seed, timeout, None) for i in range(samples)]
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    errors = [error for result in results for error in result[1]]
+    return (retained - baseline) / samples / 1e3, (peak - baseline) / samples / 1e3, errors
+
+def current_rss_mb():
+    """
+    Resident memory of this process in MB (NaN if it cannot be read)
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+    except ImportError:
+        return float("nan")
+
+def summarize(seconds):
+    """
+    Latency percentiles in milliseconds
+    """
+    ms = np.array(seconds) * 1000
+    if not len(ms):
+        return {key: float("nan") for key in ["p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms"]}
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()) if len(ms) else float("nan")
+    }
+
+def run_level(sessions, iterations, seed, timeout):
+    """
+    Run a number of concurrent sessions and measure the node under load
+    Parameters:
+    sessions : int
+        Number of simultaneous sessions
+    iterations : int
+        Times each session repeats its interaction script
+    seed : int
+        Base random seed
+    timeout : float
+        Seconds before a single script run is considered failed
+    Returns:
+    -------
+    dict
+        Latency percentiles, throughput, CPU and memory figures
+    """
+    gc.collect()
+    rss_before = current_rss_mb()
+    barrier = threading.Barrier(sessions, timeout=timeout)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(run_session, i, iterations, seed, timeout, barrier) for i in range(sessions)]
+        results = [future.result() for future in futures]
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    rss_after = current_rss_mb()
+
+    timings = [timing for result in results for timing in result[0]]
+    errors = [error for result in results for error in result[1]]
+    del results
+    by_action = {}
+    for action, seconds in timings:
+        by_action.setdefault(action, []).append(seconds)
+
+    return {
+        "sessions": sessions,
+        "interactions": len(timings),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "wall_s": wall,
+        "throughput_per_s": len(timings) / wall,
+        "cpu_cores": cpu / wall,
+        "cpu_ms_per_interaction": cpu * 1000 / max(len(timings), 1),
+        "rss_growth_mb_per_session": (rss_after - rss_before) / sessions,
+        **summarize([seconds for _, seconds in timings]),
+        "actions": {action: summarize(seconds) for action, seconds in by_action.items()}
+    }
+
+def print_report(levels, memory, baseline=None):
+    """
+    Print a capacity table, optionally with p95/p99/throughput change vs a baseline run
+    """
+    header = f"{'Sessions':>8} {'Runs':>6} {'Errors':>6} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'Max':>8} {'Runs/s':>8} {'CPU':>6} {'CPU ms':>8} {'RSS MB':>7}"
+    print(header)
+    print("-" * len(header))
+    for level in levels:
+        print(
+            f"{level['sessions']:>8} {level['interactions']:>6} {level['errors']:>6} "
+            f"{level['p50_ms']:>8.0f} {level['p90_ms']:>8.0f} {level['p95_ms']:>8.0f} "
+            f"{level['p99_ms']:>8.0f} {level['max_ms']:>8.0f} {level['throughput_per_s']:>8.2f} "
+            f"{level['cpu_cores']:>6.2f} {level['cpu_ms_per_interaction']:>8.0f} {level['rss_growth_mb_per_session']:>7.1f}"
+        )
+    print("Latencies in ms. CPU = average cores busy; CPU ms = process CPU time per interaction.")
+    print("RSS MB = process RSS growth divided by sessions (includes shared caches and rarely shrinks, so it is noisy).")
+    print(
+        f"\nMemory per session (tracemalloc, {memory['samples']} sessions kept alive): "
+        f"{memory['retained_kb']:.0f} KB retained, {memory['peak_kb']:.0f} KB peak"
+    )
+
+    for level in levels:
+        print(f"\nPer-action latency at {level['sessions']} sessions (ms):")
+        for action, stats in level["actions"].items():
+            print(f"  {action:<18} p50 {stats['p50_ms']:>8.0f}   p95 {stats['p95_ms']:>8.0f}   p99 {stats['p99_ms']:>8.0f}")
+
+    if baseline:
+        previous = {level["sessions"]: level for level in baseline["levels"]}
+        print("\nChange vs baseline:")
+        for level in levels:
+            before = previous.get(level["sessions"])
+            if before is None:
+                continue
+            changes = []
+            for key in ["p95_ms", "p99_ms", "throughput_per_s"]:
+                change = (level[key] / before[key] - 1) * 100 if before[key] else float("nan")
+                changes.append(f"{key} {change:+.1f}%")
+            print(f"  {level['sessions']:>4} sessions: " + ", ".join(changes))
+
+def main():
+    global data_latency
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app.py")
+    parser.add_argument("--sessions", default="1,5,10", help="Comma-separated concurrency levels to run (default: 1,5,10)")
+    parser.add_argument("--iterations", type=int, default=3, help="Times each session repeats the interaction script (default: 3)")
+    parser.add_argument("--data-latency", type=float, default=50, help="Simulated data source latency per request in ms (default: 50)")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds before a script run is considered failed (default: 60)")
+    parser.add_argument("--memory-sessions", type=int, default=3, help="Sessions kept alive to measure memory per session (default: 3)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for interaction choices (default: 42)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file from an earlier --output run")
+    args = parser.parse_args()
+
+    data_latency = args.data_latency / 1000
+    levels_to_run = sorted(int(s) for s in args.sessions.split(",") if s.strip())
+
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(yf, "Ticker", StandInTicker))
+        stack.enter_context(mock.patch.object(yf, "download", stand_in_download))
+        shared_runtime(stack)
+        print(f"Warming up (Streamlit {streamlit.__version__}, harness tested with {TESTED_STREAMLIT})...")
+        warm_up = run_level(1, 1, args.seed, args.timeout)
+        if warm_up["errors"]:
+            print("Warm-up failed, so no load was run:", file=sys.stderr)
+            for sample in warm_up["error_samples"]:
+                print(f"  {sample}", file=sys.stderr)
+            sys.exit(1)
+        if Runtime._instance is None:
+            raise RuntimeError("AppTest sessions are not sharing a runtime; this Streamlit version is not supported")
+        levels = []
+        for sessions in levels_to_run:
+            print(f"Running {sessions} concurrent session(s)...")
+            levels.append(run_level(sessions, args.iterations, args.seed, args.timeout))
+        print(f"Measuring memory of {args.memory_sessions} session(s)...")
+        retained_kb, peak_kb, memory_errors = measure_session_memory(args.memory_sessions, args.iterations, args.seed, args.timeout)
+        memory = {
+            "samples": args.memory_sessions,
+            "retained_kb": retained_kb,
+            "peak_kb": peak_kb,
+            "errors": len(memory_errors),
+            "error_samples": sorted(set(memory_errors))[:5]
+        }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print()
+    print_report(levels, memory, baseline)
+
+    failed = [level for level in levels if level["errors"]]
+    if memory["errors"]:
+        failed.append(dict(memory, sessions="memory"))
+    if failed:
+        print("\nWARNING: some runs failed, so these numbers do not reflect a working app:", file=sys.stderr)
+        for level in failed:
+            print(f"  {level['sessions']} sessions: {level['errors']} errors", file=sys.stderr)
+            for sample in level["error_samples"]:
+                print(f"    {sample}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "timestamp": datetime.now().isoformat(),
+                "iterations": args.iterations,
+                "data_latency_ms": args.data_latency,
+                "streamlit_version": streamlit.__version__,
+                "valid": not failed,
+                "levels": levels,
+                "session_memory": memory
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()